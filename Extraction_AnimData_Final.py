@@ -1,6 +1,11 @@
 import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 import csv
+import functools
+import itertools
+import operator
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # ==========================================================
 # Globals
@@ -9,40 +14,176 @@ WINDOW = "UVTextureExportUI"
 EXPORT_PATH = ""
 TEXTURE_CHECKBOXES = {}
 
+# Large write buffer so CSV rows reach the disk in few syscalls
+CSV_BUFFER_SIZE = 1 << 20
+
+# Worker threads writing CSV files in parallel
+CSV_WORKERS = min(8, os.cpu_count() or 1)
+
 # ==========================================================
 # Scene Queries
 # ==========================================================
 def get_materials_from_geo(geo):
-    materials = set()
-    shapes = cmds.listRelatives(geo, shapes=True, fullPath=True) or []
-    for s in shapes:
-        sgs = cmds.listConnections(s + ".instObjGroups[0]", type="shadingEngine") or []
-        for sg in sgs:
-            mats = cmds.listConnections(sg + ".surfaceShader", s=True, d=False) or []
-            materials.update(mats)
-    return list(materials)
+    # Shading engines of all the geo's shapes and instances in one query
+    sgs = cmds.listSets(object=geo, type=1, extendToShape=True) or []
+    if not sgs:
+        return []
+    mats = cmds.listConnections([sg + ".surfaceShader" for sg in sgs], s=True, d=False) or []
+    return list(set(mats))
 
 def get_file_textures_from_material(material):
-    files = set()
     history = cmds.listHistory(material, pruneDagObjects=True) or []
-    for h in history:
-        if cmds.nodeType(h) == "file":
-            files.add(h)
-    return sorted(files)
+    if not history:
+        return []
+    # Let Maya filter by type in one call instead of a nodeType query per node
+    files = cmds.ls(history, type="file") or []
+    return sorted(set(files))
+
+def get_place2d_map(file_nodes):
+    """Map file nodes to their place2dTexture with a single listConnections call"""
+    if not file_nodes:
+        return {}
+    conns = cmds.listConnections(
+        [fn + ".uvCoord" for fn in file_nodes], s=True, d=False, connections=True
+    ) or []
+
+    # Returned as flat (file plug, place2d node) pairs, first connection wins
+    place_map = {}
+    for plug, place in zip(conns[::2], conns[1::2]):
+        place_map.setdefault(plug.split(".")[0], place)
+    return place_map
+
+def is_static(attr):
+    """True if nothing drives the attribute, or for a computed output, nothing feeds its node"""
+    node, name = attr.split(".", 1)
+    # Computed outputs (e.g. multiplyDivide.outputX) follow their node's inputs,
+    # so they only hold still when nothing at all feeds that node
+    if not cmds.attributeQuery(name, node=node, writable=True):
+        return not cmds.listConnections(node, s=True, d=False)
+    return not cmds.connectionInfo(attr, isDestination=True)
+
+def uses_frame_extension(file_node):
+    if cmds.objExists(file_node + ".useFrameExtension"):
+        return bool(cmds.getAttr(file_node + ".useFrameExtension"))
+    return False
 
-def get_place2d(file_node):
-    p = cmds.listConnections(file_node + ".uvCoord", s=True, d=False)
-    return p[0] if p else None
+# ==========================================================
+# Helpers: time sampling
+# ==========================================================
+def get_plug(attr):
+    """Look up the MPlug behind a "node.attr" string once"""
+    sel = om2.MSelectionList()
+    sel.add(attr)
+    return sel.getPlug(0)
+
+def attr_reader(attr):
+    """Bind a reader returning the attribute's value in the current DG context"""
+    # Cached plugs skip the command engine's name parsing and node lookup on every read
+    plug = get_plug(attr)
+    attr_obj = plug.attribute()
+
+    if attr_obj.hasFn(om2.MFn.kNumericAttribute):
+        numeric_type = om2.MFnNumericAttribute(attr_obj).numericType()
+        if numeric_type in (om2.MFnNumericData.kFloat, om2.MFnNumericData.kDouble):
+            return plug.asDouble
+        if numeric_type in (
+            om2.MFnNumericData.kShort,
+            om2.MFnNumericData.kInt,
+            om2.MFnNumericData.kByte,
+            om2.MFnNumericData.kChar
+        ):
+            return plug.asInt
+
+    if attr_obj.hasFn(om2.MFn.kUnitAttribute):
+        if om2.MFnUnitAttribute(attr_obj).unitType() == om2.MFnUnitAttribute.kAngle:
+            # getAttr reports angles in UI units (degrees by default), the API in radians
+            unit = om2.MAngle.uiUnit()
+            return lambda: plug.asMAngle().asUnits(unit)
+
+    # cmds ignores the context guard, so pass its time explicitly
+    return lambda: cmds.getAttr(
+        attr, time=om2.MDGContext.current().getTime().asUnits(om2.MTime.uiUnit())
+    )
 
-def get_active_image(file_node):
-    if cmds.objExists(file_node + ".useFrameExtension"):
-        if cmds.getAttr(file_node + ".useFrameExtension"):
-            return cmds.getAttr(file_node + ".frameExtension")
-    return None
+# ==========================================================
+# Helpers: scene evaluation
+# ==========================================================
+def suspend_scene_updates(state):
+    """Switch to DG evaluation and stop viewport redraws while sampling"""
+    # Each setting is recorded before it is changed, so a partial failure
+    # still lets restore_scene_updates undo exactly what was applied
+    state["mode"] = cmds.evaluationManager(q=True, mode=True)[0]
+    cmds.evaluationManager(mode="off")
+
+    state["suspended"] = cmds.refresh(q=True, suspend=True)
+    if not state["suspended"]:
+        cmds.refresh(suspend=True)
+
+    state["paused"] = cmds.ogs(q=True, pause=True)
+    if not state["paused"]:
+        cmds.ogs(pause=True)
+
+def restore_scene_updates(state):
+    """Undo whatever suspend_scene_updates applied, leaving prior settings alone"""
+    try:
+        if state.get("paused") is False:
+            # ogs -pause toggles, so this resumes the viewport
+            cmds.ogs(pause=True)
+    finally:
+        try:
+            if state.get("suspended") is False:
+                cmds.refresh(suspend=False)
+        finally:
+            if "mode" in state:
+                cmds.evaluationManager(mode=state["mode"])
+
+# ==========================================================
+# Helpers: change detection
+# ==========================================================
+def kept_frames(frames, states, collect_all):
+    """Return the frames to export and their value tuples"""
+    if collect_all:
+        return frames, states
+
+    # One pass over the whole frame x value table, first frame always kept
+    keep = [True] + list(map(operator.ne, states[1:], states))
+    return list(itertools.compress(frames, keep)), list(itertools.compress(states, keep))
+
+# ==========================================================
+# Helpers: CSV output
+# ==========================================================
+def format_csv_row(values):
+    """Format a row exactly like csv.writer does for our numeric/node-name fields"""
+    # No quoting: callers check names with needs_csv_quoting first
+    return ",".join("" if v is None else str(v) for v in values) + "\r\n"
+
+def needs_csv_quoting(text):
+    """True if csv.writer would quote this field"""
+    return any(c in text for c in ',"\r\n')
+
+def write_datatable_csv(path, header, prefix, frames, states, quoted=False):
+    """Write one texture's data table; plain file IO, safe off the main thread"""
+    with open(path, "w", newline="", buffering=CSV_BUFFER_SIZE) as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        rows = ([f] + prefix + list(state) for f, state in zip(frames, states))
+        if quoted:
+            # A name needs escaping, let csv.writer handle the whole file
+            writer.writerows(rows)
+        else:
+            csv_file.writelines(map(format_csv_row, rows))
+
+def write_curve_csv(path, options, frames, states):
+    """Write one texture's curve table; plain file IO, safe off the main thread"""
+    with open(path, "w", newline="", buffering=CSV_BUFFER_SIZE) as csv_file:
+        csv_file.write(format_csv_row([""] + frames))
+        for opt, values in zip(options, zip(*states)):
+            csv_file.write(format_csv_row([opt] + list(values)))
 
 # ==========================================================
 # Helpers: corr-node sampling
 # ==========================================================
+@functools.lru_cache(maxsize=None)
 def _keyword_from_names(file_node, place_node):
     keys = []
     for s in (file_node, place_node):
@@ -52,78 +193,138 @@ def _keyword_from_names(file_node, place_node):
         for k in ("iris", "pupil", "eye"):
             if k in s:
                 keys.append(k)
-    return keys
+    # Cached result is shared between callers, so hand out an immutable tuple
+    return tuple(keys)
+
+def get_corr_nodes():
+    """Collect the corr multiplyDivide nodes once per export"""
+    return {
+        "trans":   cmds.ls("Translation_Corr_*", type="multiplyDivide") or [],
+        "scale_u": cmds.ls("ScaleU_corr_*", type="multiplyDivide") or [],
+        "scale_v": cmds.ls("ScaleV_corr_*", type="multiplyDivide") or []
+    }
 
-def get_offset_uv(file_node, place_node):
+def resolve_corr_nodes(file_node, place_node, corr_nodes):
+    """Match the translation and scale corr nodes driving one texture"""
     keys = _keyword_from_names(file_node, place_node)
-    nodes = cmds.ls("Translation_Corr_*", type="multiplyDivide") or []
 
+    trans = None
     for k in keys:
-        for n in nodes:
+        for n in corr_nodes["trans"]:
             if k in n.lower():
-                return cmds.getAttr(n + ".outputX"), cmds.getAttr(n + ".outputY")
-
-    if nodes:
-        return cmds.getAttr(nodes[0] + ".outputX"), cmds.getAttr(nodes[0] + ".outputY")
+                trans = n
+                break
+        if trans:
+            break
 
-    return cmds.getAttr(place_node + ".offsetU"), cmds.getAttr(place_node + ".offsetV")
+    if trans is None and corr_nodes["trans"]:
+        trans = corr_nodes["trans"][0]
 
-def get_scale_uv(file_node, place_node):
     su = None
     sv = None
-
-    keys = _keyword_from_names(file_node, place_node)
-
-    nodes_u = cmds.ls("ScaleU_corr_*", type="multiplyDivide") or []
-    nodes_v = cmds.ls("ScaleV_corr_*", type="multiplyDivide") or []
-
     for k in keys:
-        for n in nodes_u:
+        for n in corr_nodes["scale_u"]:
             if k in n.lower():
-                su = cmds.getAttr(n + ".outputX")
-        for n in nodes_v:
+                su = n
+        for n in corr_nodes["scale_v"]:
             if k in n.lower():
-                sv = cmds.getAttr(n + ".outputX")
+                sv = n
+
+    return trans, su, sv
+
+def get_offset_attrs(place_node, trans_node):
+    if trans_node:
+        return trans_node + ".outputX", trans_node + ".outputY"
 
-    if su is None:
-        su = cmds.getAttr(place_node + ".repeatU")
-    if sv is None:
-        sv = cmds.getAttr(place_node + ".repeatV")
+    return place_node + ".offsetU", place_node + ".offsetV"
 
+def get_scale_attrs(place_node, su_node, sv_node):
+    su = su_node + ".outputX" if su_node else place_node + ".repeatU"
+    sv = sv_node + ".outputX" if sv_node else place_node + ".repeatV"
     return su, sv
 
+# ==========================================================
+# Helpers: option readers
+# ==========================================================
+def build_readers(file_node, place, corr_nodes, options):
+    """Bind one reader per export option, in column order, and flag fully static textures"""
+    trans, su_node, sv_node = resolve_corr_nodes(file_node, place, corr_nodes)
+
+    attrs = {"RotateUV": place + ".rotateUV"}
+    attrs["OffsetU"], attrs["OffsetV"] = get_offset_attrs(place, trans)
+    attrs["ScaleU"], attrs["ScaleV"] = get_scale_attrs(place, su_node, sv_node)
+
+    readers = []
+    static = True
+    for opt in options:
+        if opt == "ActiveImage":
+            # useFrameExtension is checked once, not every frame
+            attr = file_node + ".frameExtension" if uses_frame_extension(file_node) else None
+        else:
+            attr = attrs[opt]
+
+        if attr is None or is_static(attr):
+            # Undriven values are the same on every frame, so read them once
+            value = None if attr is None else cmds.getAttr(attr)
+            readers.append(lambda value=value: value)
+        else:
+            readers.append(attr_reader(attr))
+            static = False
+
+    return readers, static
+
 # ==========================================================
 # Texture UI
 # ==========================================================
 def refresh_texture_list():
     global TEXTURE_CHECKBOXES
-    TEXTURE_CHECKBOXES.clear()
 
-    if cmds.columnLayout("textureColumn", exists=True):
-        cmds.deleteUI("textureColumn")
+    if cmds.text("textureStatus", exists=True):
+        cmds.deleteUI("textureStatus")
 
-    cmds.setParent("textureScroll")
-    cmds.columnLayout("textureColumn", adjustableColumn=True)
+    textures = set()
+    status = None
 
     sel = cmds.ls(sl=True)
     if not sel:
-        cmds.text(label="No geometry selected.")
-        return
+        status = "No geometry selected."
+    else:
+        geo = sel[0]
+        materials = get_materials_from_geo(geo)
 
-    geo = sel[0]
-    materials = get_materials_from_geo(geo)
+        for mat in materials:
+            textures.update(get_file_textures_from_material(mat))
 
-    textures = set()
-    for mat in materials:
-        textures.update(get_file_textures_from_material(mat))
+        if not textures:
+            status = "No file textures found."
 
-    if not textures:
-        cmds.text(label="No file textures found.")
-        return
+    # Only touch the checkboxes that changed, existing ones keep their state
+    for tex in set(TEXTURE_CHECKBOXES) - textures:
+        cmds.deleteUI(TEXTURE_CHECKBOXES.pop(tex), control=True)
+
+    added = sorted(textures - set(TEXTURE_CHECKBOXES))
+    cmds.setParent("textureColumn")
 
-    for tex in sorted(textures):
-        cb = cmds.checkBox(label=tex, v=True)
-        TEXTURE_CHECKBOXES[tex] = cb
+    if added:
+        # Unmanaged while filling, so the layout is recomputed once
+        cmds.columnLayout("textureColumn", e=True, manage=False)
+
+        values = {}
+        if TEXTURE_CHECKBOXES and added[0] < max(TEXTURE_CHECKBOXES):
+            # The column can only append, so rebuild it in sorted order
+            for tex, cb in TEXTURE_CHECKBOXES.items():
+                values[tex] = cmds.checkBox(cb, q=True, v=True)
+                cmds.deleteUI(cb, control=True)
+            TEXTURE_CHECKBOXES.clear()
+            added = sorted(textures)
+
+        for tex in added:
+            cb = cmds.checkBox(label=tex, v=values.get(tex, True))
+            TEXTURE_CHECKBOXES[tex] = cb
+        cmds.columnLayout("textureColumn", e=True, manage=True)
+
+    if status:
+        cmds.text("textureStatus", label=status)
 
 # ==========================================================
 # Export Logic
@@ -149,88 +350,111 @@ def export_textures(options, meta, export_mode, collect_all):
     base_dir = os.path.dirname(EXPORT_PATH)
     base_name = os.path.splitext(os.path.basename(EXPORT_PATH))[0]
 
-    for mat in materials:
-        for file_node in get_file_textures_from_material(mat):
-
-            if file_node not in TEXTURE_CHECKBOXES:
-                continue
-            if not cmds.checkBox(TEXTURE_CHECKBOXES[file_node], q=True, v=True):
-                continue
-
-            place = get_place2d(file_node)
-            if not place:
-                continue
-
-            csv_path = os.path.join(base_dir, f"{base_name}_{file_node}.csv")
-
-            rows = []
-            curve_frames = []
-            curve_values = {opt: [] for opt in options}
-            last_state = None
-
-            for f in range(start, end + 1):
-                cmds.currentTime(f, edit=True)
-
-                current = {}
-
-                if "ActiveImage" in options:
-                    current["ActiveImage"] = get_active_image(file_node)
-
-                if "OffsetU" in options or "OffsetV" in options:
-                    ou, ov = get_offset_uv(file_node, place)
-                    if "OffsetU" in options:
-                        current["OffsetU"] = ou
-                    if "OffsetV" in options:
-                        current["OffsetV"] = ov
-
-                if "ScaleU" in options or "ScaleV" in options:
-                    su, sv = get_scale_uv(file_node, place)
-                    if "ScaleU" in options:
-                        current["ScaleU"] = su
-                    if "ScaleV" in options:
-                        current["ScaleV"] = sv
-
-                if "RotateUV" in options:
-                    current["RotateUV"] = cmds.getAttr(place + ".rotateUV")
-
-                state = [current[o] for o in options]
-
-                if collect_all or state != last_state:
-                    row = [f]
-                    if meta["geo"]:
-                        row.append(geo)
-                    if meta["mat"]:
-                        row.append(mat)
-                    if meta["file"]:
-                        row.append(file_node)
-                    for opt in options:
-                        row.append(current[opt])
-                    rows.append(row)
-
-                    curve_frames.append(f)
-                    for opt in options:
-                        curve_values[opt].append(current[opt])
-
-                    last_state = state
-
-            with open(csv_path, "w", newline="") as f:
-                writer = csv.writer(f)
-
-                if export_mode == "datatable":
-                    header = ["Frame"]
-                    if meta["geo"]:
-                        header.append("Geometry")
-                    if meta["mat"]:
-                        header.append("Material")
-                    if meta["file"]:
-                        header.append("FileTexture")
-                    header.extend(options)
-                    writer.writerow(header)
-                    writer.writerows(rows)
-                else:
-                    writer.writerow([""] + curve_frames)
-                    for opt in options:
-                        writer.writerow([opt] + curve_values[opt])
+    frames = list(range(start, end + 1))
+
+    scene_state = {}
+    try:
+        suspend_scene_updates(scene_state)
+
+        # The corr-node set does not change during playback
+        corr_nodes = get_corr_nodes()
+
+        # Gather every selected texture before sampling
+        mat_files = [(mat, get_file_textures_from_material(mat)) for mat in materials]
+        place_map = get_place2d_map(sorted({fn for _, files in mat_files for fn in files}))
+
+        jobs = {}
+        for mat, files in mat_files:
+            for file_node in files:
+
+                if file_node not in TEXTURE_CHECKBOXES:
+                    continue
+                if not cmds.checkBox(TEXTURE_CHECKBOXES[file_node], q=True, v=True):
+                    continue
+
+                place = place_map.get(file_node)
+                if not place:
+                    continue
+
+                csv_path = os.path.join(base_dir, f"{base_name}_{file_node}.csv")
+
+                if csv_path in jobs:
+                    # Same texture under another material: the last one wins,
+                    # as the sequential writes did, and it is sampled only once
+                    jobs[csv_path]["mat"] = mat
+                    continue
+
+                readers, static = build_readers(file_node, place, corr_nodes, options)
+
+                jobs[csv_path] = {
+                    "mat": mat,
+                    "file": file_node,
+                    "path": csv_path,
+                    "readers": readers,
+                    "static": static,
+                    "states": []
+                }
+
+        jobs = list(jobs.values())
+
+        # Static textures repeat one state, only animated ones join the frame sweep
+        live_jobs = []
+        for job in jobs:
+            if job["static"]:
+                job["states"] = [tuple([read() for read in job["readers"]])] * len(frames)
+            else:
+                live_jobs.append(job)
+
+        # One DG context per frame, shared by every reader of every texture.
+        # Unlike currentTime this fires no time-change callbacks or dirty propagation.
+        if live_jobs:
+            unit = om2.MTime.uiUnit()
+            for f in frames:
+                with om2.MDGContextGuard(om2.MDGContext(om2.MTime(f, unit))):
+                    for job in live_jobs:
+                        job["states"].append(tuple([read() for read in job["readers"]]))
+    finally:
+        restore_scene_updates(scene_state)
+
+    header = ["Frame"]
+    if meta["geo"]:
+        header.append("Geometry")
+    if meta["mat"]:
+        header.append("Material")
+    if meta["file"]:
+        header.append("FileTexture")
+    header.extend(options)
+
+    # Only file IO runs on the pool, Maya commands stay on the main thread
+    with ThreadPoolExecutor(max_workers=CSV_WORKERS) as pool:
+        futures = []
+        for job in jobs:
+            out_frames, out_states = kept_frames(frames, job["states"], collect_all)
+
+            if export_mode == "datatable":
+                prefix = []
+                if meta["geo"]:
+                    prefix.append(geo)
+                if meta["mat"]:
+                    prefix.append(job["mat"])
+                if meta["file"]:
+                    prefix.append(job["file"])
+
+                # Checked once per file, not per row
+                quoted = any(map(needs_csv_quoting, prefix))
+
+                futures.append(pool.submit(
+                    write_datatable_csv, job["path"], header, prefix, out_frames, out_states,
+                    quoted
+                ))
+            else:
+                futures.append(pool.submit(
+                    write_curve_csv, job["path"], options, out_frames, out_states
+                ))
+
+        # Surface any write error here
+        for future in futures:
+            future.result()
 
     cmds.inViewMessage(
         amg="<hl>Texture export complete</hl>",
@@ -276,6 +500,9 @@ def build_ui():
     if cmds.window(WINDOW, exists=True):
         cmds.deleteUI(WINDOW)
 
+    # The texture column is rebuilt with the window, so its checkboxes go too
+    TEXTURE_CHECKBOXES.clear()
+
     cmds.window(WINDOW, title="Texture UV Animation Export", sizeable=False)
     cmds.columnLayout(adj=True, rowSpacing=6)
 